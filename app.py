@@ -42,19 +42,32 @@ def save_agent(agent) -> None:
 		pickle.dump(agent, f)
 
 
+# Loaded agents by path, with the file's mtime at load time. /api/move
+# loads the agent on every request; reusing it skips unpickling (and the
+# conversion of legacy Q-table layouts) until the file changes.
+_AGENT_CACHE = {}
+
+
+def _load_agent_file(path: str):
+	mtime = os.stat(path).st_mtime_ns
+	hit = _AGENT_CACHE.get(path)
+	if hit is None or hit[0] != mtime:
+		with open(path, 'rb') as f:
+			hit = _AGENT_CACHE[path] = (mtime, pickle.load(f))
+	return hit[1]
+
+
 # Redefine functions with Vercel-friendly behavior (overrides above)
 def load_or_init_agent():
 	# Try configured path first
 	if os.path.isfile(AGENT_PATH):
-		with open(AGENT_PATH, 'rb') as f:
-			agent = pickle.load(f)
+		agent = _load_agent_file(AGENT_PATH)
 		agent.eps = EPSILON
 		return agent
 	# Fallback to bundled pretrained pickle (read-only in deployment)
 	bundle_path = os.path.join(os.path.dirname(__file__), _DEFAULT_AGENT_FILENAME)
 	if os.path.isfile(bundle_path):
-		with open(bundle_path, 'rb') as f:
-			agent = pickle.load(f)
+		agent = _load_agent_file(bundle_path)
 		agent.eps = EPSILON
 		return agent
 	# init new
@@ -127,11 +140,12 @@ def api_move():
 
 	agent = load_or_init_agent()
 	game = Game(agent)
-	game.board = [row[:] for row in board]
+	board = [row[:] for row in board]
 
 	# Apply player's move (X)
-	if not apply_player_move(game.board, (int(player_move[0]), int(player_move[1]))):
+	if not apply_player_move(board, (int(player_move[0]), int(player_move[1]))):
 		return jsonify({'error': 'Invalid move'}), 400
+	game.board = board
 
 	# Check if player ended the game
 	player_end = game.checkForEnd('X')
@@ -1,58 +1,145 @@
 import argparse
+import math
 import os
 import pickle
 import random
-from typing import Tuple
+from multiprocessing import Pool, cpu_count
+from typing import Optional, Tuple
+
+import numpy as np
 
 from tictactoe.agent import Qlearner, SARSAlearner
-from tictactoe.game import getStateKey, best_move_minimax
+from tictactoe.game import (
+    FULL_BOARD, SYM_INVERSE, minimax_move,
+    _legal_moves, _winner_after,
+)
 from tictactoe.teacher import Teacher
 
 
-def _legal_moves(board):
-    moves = []
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == '-':
-                moves.append((i, j))
-    return moves
-
-
-def _winner(board):
-    # returns 'X', 'O', 'D' for draw, or None if ongoing
-    lines = [
-        # rows
-        [(0, 0), (0, 1), (0, 2)],
-        [(1, 0), (1, 1), (1, 2)],
-        [(2, 0), (2, 1), (2, 2)],
-        # cols
-        [(0, 0), (1, 0), (2, 0)],
-        [(0, 1), (1, 1), (2, 1)],
-        [(0, 2), (1, 2), (2, 2)],
-        # diagonals
-        [(0, 0), (1, 1), (2, 2)],
-        [(0, 2), (1, 1), (2, 0)],
-    ]
-    for line in lines:
-        a, b, c = line
-        v1, v2, v3 = board[a[0]][a[1]], board[b[0]][b[1]], board[c[0]][c[1]]
-        if v1 != '-' and v1 == v2 == v3:
-            return v1
-    if any(board[i][j] == '-' for i in range(3) for j in range(3)):
-        return None
-    return 'D'
-
-
-def _agent_greedy_move(agent, board) -> Tuple[int, int]:
-    """Return the agent's greedy (eps=0) move without learning side-effects."""
-    state = getStateKey(board)
-    possible = _legal_moves(board)
-    # Choose action that maximizes Q(a, s). Break ties randomly.
-    values = [agent.Q[a][state] for a in possible]
-    max_val = max(values)
-    best_idxs = [i for i, v in enumerate(values) if v == max_val]
-    choice_idx = random.choice(best_idxs)
-    return possible[choice_idx]
+def _agent_greedy_move(agent, x_bb, o_bb) -> Tuple[int, bool]:
+    """
+    Return the agent's greedy (eps=0) move bit without learning side-effects,
+    and whether that move was the unique best (no random tie-break).
+    """
+    # Q-values may be stored for another orientation of the board
+    c, p = agent.orient((x_bb << 9) | o_bb)
+    empty = ~((c >> 9) | c) & FULL_BOARD
+    values = agent.Q[c].tolist()
+    # Choose action that maximizes Q(a, s) in a single pass. Ties are broken
+    # uniformly by reservoir sampling: the n-th equal value replaces the
+    # current pick with probability 1/n.
+    best, count, ix_select = -math.inf, 0, 0
+    for k in range(9):
+        if not empty >> k & 1:
+            continue
+        v = values[k]
+        if v > best:
+            best, count, ix_select = v, 1, k
+        elif v == best:
+            count += 1
+            if random.random() * count < 1:
+                ix_select = k
+    return 1 << SYM_INVERSE[p][ix_select], count == 1
+
+
+def _play_game(agent, opp_move, replay=None):
+    """
+    Play one evaluation game and return the result: 'X', 'O' or 'D'.
+
+    If the opponent is deterministic, pass a dict as `replay`. Every agent
+    turn from which the rest of the game was forced (unique greedy move at
+    each later turn) is recorded there with the result, and later games stop
+    as soon as they reach one of those positions.
+    """
+    x_bb = o_bb = 0
+    turn = 'X'  # opponent starts as X
+    forced = []  # agent-to-move states since the last random tie-break
+    while True:
+        if turn == 'X':
+            x_bb |= opp_move(x_bb, o_bb)
+            end = _winner_after(x_bb, o_bb, 'X')
+            if end != -1:
+                term = 'X' if end == 1 else 'D'
+                break
+            turn = 'O'
+        else:  # agent 'O'
+            state = (x_bb << 9) | o_bb
+            if replay is not None and state in replay:
+                term = replay[state]
+                break
+            move, unique = _agent_greedy_move(agent, x_bb, o_bb)
+            if unique:
+                forced.append(state)
+            else:
+                forced.clear()
+            o_bb |= move
+            end = _winner_after(x_bb, o_bb, 'O')
+            if end != -1:
+                term = 'O' if end == 1 else 'D'
+                break
+            turn = 'X'
+    if replay is not None:
+        for state in forced:
+            replay[state] = term
+    return term
+
+
+def _make_opponent(opponent, teacher_ability):
+    """Build the opponent policy; it returns the bit of the chosen cell."""
+    if opponent == 'random':
+        def opp_move(x_bb, o_bb):
+            return random.choice(list(_legal_moves(x_bb, o_bb)))
+    elif opponent == 'teacher':
+        teacher = Teacher(level=teacher_ability)
+        def opp_move(x_bb, o_bb):
+            i, j = teacher.makeMove(state=(x_bb << 9) | o_bb)
+            return 1 << (3 * i + j)
+    else:  # minimax (default)
+        def opp_move(x_bb, o_bb):
+            return minimax_move(x_bb, o_bb, key='X')
+    return opp_move
+
+
+def _play_games(agent, opponent, teacher_ability, games, verbose=False):
+    """Play `games` evaluation games and return (wins, draws, losses)."""
+    opp_move = _make_opponent(opponent, teacher_ability)
+    # The minimax opponent always answers the same way, so games that reach
+    # an already-finished forced line can reuse its result
+    replay = {} if opponent == 'minimax' else None
+
+    wins = draws = losses = 0
+
+    for g in range(games):
+        if verbose:
+            print(f"\nGame {g+1}")
+        term = _play_game(agent, opp_move, replay)
+        if term == 'X':
+            losses += 1
+        elif term == 'O':
+            wins += 1
+        else:
+            draws += 1
+
+    return wins, draws, losses
+
+
+# Per-process state for pool workers, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(agent_path, opponent, teacher_ability):
+    # forked workers inherit the parent's RNG state; reseed so their games differ
+    random.seed()
+    np.random.seed()
+    with open(agent_path, 'rb') as f:
+        _worker['agent'] = pickle.load(f)
+    _worker['opponent'] = opponent
+    _worker['teacher_ability'] = teacher_ability
+
+
+def _play_chunk(games):
+    return _play_games(_worker['agent'], _worker['opponent'],
+                       _worker['teacher_ability'], games)
 
 
 def evaluate_agent(
@@ -62,68 +149,36 @@ def evaluate_agent(
     opponent: str = 'minimax',  # 'minimax' | 'random' | 'teacher'
     teacher_ability: float = 0.9,
     verbose: bool = False,
+    workers: Optional[int] = 1,
 ):
     """
     Evaluate a trained agent by playing games without learning updates.
 
     - Agent plays as 'O'. Opponent plays as 'X' and moves first.
     - Greedy policy is used (no exploration, no Q updates).
+    - With workers > 1 (None = one per CPU) the games are split across a
+      process pool, each worker loading its own copy of the agent.
+      Verbose runs are always serial.
 
     Returns (wins, draws, losses).
     """
-    # Load agent
     if not os.path.isfile(agent_path):
         raise FileNotFoundError(f"Agent not found at {agent_path}")
-    with open(agent_path, 'rb') as f:
-        agent = pickle.load(f)
-
-    # Build opponent policy
-    if opponent == 'random':
-        def opp_move(board):
-            return random.choice(_legal_moves(board))
-    elif opponent == 'teacher':
-        teacher = Teacher(level=teacher_ability)
-        def opp_move(board):
-            return teacher.makeMove(board)
-    else:  # minimax (default)
-        def opp_move(board):
-            return best_move_minimax(board, key='X')
-
-    wins = draws = losses = 0
-
-    for g in range(games):
-        board = [['-', '-', '-'], ['-', '-', '-'], ['-', '-', '-']]
-        turn = 'X'  # opponent starts as X
-        if verbose:
-            print(f"\nGame {g+1}")
-        while True:
-            if turn == 'X':
-                i, j = opp_move(board)
-                board[i][j] = 'X'
-                term = _winner(board)
-                if term is not None:
-                    if term == 'X':
-                        losses += 1
-                    elif term == 'O':
-                        wins += 1
-                    else:
-                        draws += 1
-                    break
-                turn = 'O'
-            else:  # agent 'O'
-                i, j = _agent_greedy_move(agent, board)
-                board[i][j] = 'O'
-                term = _winner(board)
-                if term is not None:
-                    if term == 'X':
-                        losses += 1
-                    elif term == 'O':
-                        wins += 1
-                    else:
-                        draws += 1
-                    break
-                turn = 'X'
-
+    if workers is None:
+        workers = cpu_count()
+    workers = max(1, min(workers, games))
+
+    if workers == 1 or verbose:
+        with open(agent_path, 'rb') as f:
+            agent = pickle.load(f)
+        return _play_games(agent, opponent, teacher_ability, games, verbose)
+
+    # Spread the games as evenly as possible over the workers
+    chunks = [games // workers + (k < games % workers) for k in range(workers)]
+    with Pool(workers, initializer=_init_worker,
+              initargs=(agent_path, opponent, teacher_ability)) as pool:
+        results = pool.map(_play_chunk, chunks)
+    wins, draws, losses = (sum(col) for col in zip(*results))
     return wins, draws, losses
 
 
@@ -135,6 +190,7 @@ def main():
     parser.add_argument('--opponent', type=str, default='minimax', choices=['minimax', 'random', 'teacher'], help='Opponent policy')
     parser.add_argument('--teacher-ability', type=float, default=0.9, help='Teacher ability if opponent=teacher')
     parser.add_argument('--verbose', action='store_true', help='Print per-game progress')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes, 0 = one per CPU (default: 1)')
     args = parser.parse_args()
 
     w, d, l = evaluate_agent(
@@ -144,6 +200,7 @@ def main():
         opponent=args.opponent,
         teacher_ability=args.teacher_ability,
         verbose=args.verbose,
+        workers=args.workers or None,
     )
     total = max(1, w + d + l)
     print('\nEvaluation results:')
@@ -0,0 +1,196 @@
+"""
+Bitboard minimax kernel. Compiled with numba when it is installed,
+otherwise the same functions run as plain Python.
+"""
+import numpy as np
+
+try:
+    from numba import njit, types
+    from numba.typed import Dict
+except ImportError:
+    Dict = None
+
+    def njit(*args, **kwargs):
+        # stand-in for numba.njit: return the function unchanged
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+FULL_BOARD = 0o777
+WIN_MASKS = (0o007, 0o070, 0o700, 0o111, 0o222, 0o444, 0o421, 0o124)
+# Cells in the order the search tries them: center, corners, then edges.
+# Strong moves first let alpha-beta cut off more of the tree. Only the
+# search below the root uses it; moves returned are picked in row-major order.
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+# IS_WIN[bb] is True if bitboard bb contains a complete line
+IS_WIN = np.array([any(bb & m == m for m in WIN_MASKS) for bb in range(FULL_BOARD + 1)],
+                  dtype=np.bool_)
+
+
+def new_memo():
+    """ Empty transposition table for minimax, keyed by packed state. """
+    if Dict is None:
+        return {}
+    return Dict.empty(key_type=types.int64, value_type=types.UniTuple(types.int64, 2))
+
+
+@njit
+def minimax(x_bb, o_bb, side, memo):
+    """
+    Returns (score, best_move_bit) for the player to move. Scores are +1 for
+    an X win, -1 for an O win and 0 for a draw; the move bit is 0 at a
+    terminal position. Of several equally good moves the first in row-major
+    order is returned, as in fill_table(); MOVE_ORDER only orders the search
+    below the root.
+
+    Parameters
+    ----------
+    x_bb : int
+        bitboard of 'X' pieces
+    o_bb : int
+        bitboard of 'O' pieces
+    side : int
+        player to move, 0 for 'X' and 1 for 'O'
+    memo : dict
+        table from new_memo(); solved positions are stored under the key
+        side << 18 | x_bb << 9 | o_bb
+    """
+    if IS_WIN[x_bb]:
+        return 1, 0
+    if IS_WIN[o_bb]:
+        return -1, 0
+    occupied = x_bb | o_bb
+    if occupied == FULL_BOARD:
+        return 0, 0
+
+    best_score = -2 if side == 0 else 2
+    best_mv = 0
+    mask = ~occupied & FULL_BOARD
+    for cell in range(9):
+        bit = 1 << cell
+        if not mask & bit:
+            continue
+        # only a strictly better move can replace best_mv, so each child is
+        # searched with the window closed at best_score
+        if side == 0:
+            sc, _ = _alphabeta(x_bb | bit, o_bb, 1, best_score, 2, memo)
+            if sc > best_score:
+                best_score, best_mv = sc, bit
+                if best_score == 1:
+                    break
+        else:
+            sc, _ = _alphabeta(x_bb, o_bb | bit, 0, -2, best_score, memo)
+            if sc < best_score:
+                best_score, best_mv = sc, bit
+                if best_score == -1:
+                    break
+    return best_score, best_mv
+
+
+# no cache=True: numba's on-disk cache crashes reloading self-recursive functions
+@njit
+def _alphabeta(x_bb, o_bb, side, alpha, beta, memo):
+    """
+    minimax() searching only for scores inside the window (alpha, beta).
+    A result outside the window is just a bound on the true score, so only
+    exact results go into memo.
+    """
+    if IS_WIN[x_bb]:
+        return 1, 0
+    if IS_WIN[o_bb]:
+        return -1, 0
+    occupied = x_bb | o_bb
+    if occupied == FULL_BOARD:
+        return 0, 0
+    k = side << 18 | x_bb << 9 | o_bb
+    if k in memo:
+        return memo[k]
+
+    alpha0, beta0 = alpha, beta
+    best_score = -2 if side == 0 else 2
+    best_mv = 0
+    mask = ~occupied & FULL_BOARD
+    # a move into the last empty cell ends the game
+    last = mask & (mask - 1) == 0
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if not mask & bit:
+            continue
+        # score terminal children here instead of recursing into them;
+        # only the mover can have just completed a line
+        if side == 0:
+            if IS_WIN[x_bb | bit]:
+                sc = 1
+            elif last:
+                sc = 0
+            else:
+                sc, _ = _alphabeta(x_bb | bit, o_bb, 1, alpha, beta, memo)
+            if sc > best_score:
+                best_score, best_mv = sc, bit
+                if best_score == 1:
+                    break
+                alpha = max(alpha, best_score)
+                if alpha >= beta:
+                    break
+        else:
+            if IS_WIN[o_bb | bit]:
+                sc = -1
+            elif last:
+                sc = 0
+            else:
+                sc, _ = _alphabeta(x_bb, o_bb | bit, 0, alpha, beta, memo)
+            if sc < best_score:
+                best_score, best_mv = sc, bit
+                if best_score == -1:
+                    break
+                beta = min(beta, best_score)
+                if alpha >= beta:
+                    break
+    # Inside the original window the score is exact. Outside it is a bound,
+    # which is still exact when it is the extreme score in that direction.
+    if alpha0 < best_score < beta0 or \
+            (best_score >= beta0 and best_score == 1) or \
+            (best_score <= alpha0 and best_score == -1):
+        memo[k] = (best_score, best_mv)
+    return best_score, best_mv
+
+
+@njit(cache=True)
+def fill_table(keys, table):
+    """
+    Solve every position in keys, last to first, into table.
+
+    keys must list each non-terminal position before its non-terminal
+    children (e.g. by ascending piece count), so that walking them backwards
+    solves every child before its parent. table[key] becomes
+    (score + 1) << 9 | best_move_bit, with keys as in minimax(); entries
+    that are never written stay 0.
+    """
+    for n in range(len(keys) - 1, -1, -1):
+        k = keys[n]
+        side, x, o = k >> 18, k >> 9 & FULL_BOARD, k & FULL_BOARD
+        mask = ~(x | o) & FULL_BOARD
+        best = -2 if side == 0 else 2
+        mv = 0
+        for cell in range(9):
+            bit = 1 << cell
+            if not mask & bit:
+                continue
+            if side == 0:
+                cx, co = x | bit, o
+            else:
+                cx, co = x, o | bit
+            if IS_WIN[cx if side == 0 else co]:
+                sc = 1 if side == 0 else -1
+            elif (cx | co) == FULL_BOARD:
+                sc = 0
+            else:
+                sc = int(table[(1 - side) << 18 | cx << 9 | co] >> 9) - 1
+            # the first best move in row-major order wins ties, as in the
+            # original search; MOVE_ORDER would change the moves played
+            if (sc > best) if side == 0 else (sc < best):
+                best, mv = sc, bit
+                if sc == (1 if side == 0 else -1):
+                    break
+        table[k] = (best + 1) << 9 | mv
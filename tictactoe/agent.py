@@ -5,6 +5,30 @@ import collections
 import numpy as np
 import random
 
+from .game import MASK_TO_CELLS, SYM_INVERSE, SYM_PERMS, canonicalState
+
+
+def _zero_values():
+    """ Q values of a state not seen before: one zero per board cell. """
+    return np.zeros(9)
+
+
+def _zero_counts():
+    """ Visit counts of a state not seen before: one zero per board cell. """
+    return np.zeros(9, dtype=np.int64)
+
+
+def _empty_cells(s):
+    """ Bitmask of the empty cells in state key s = (x_bb << 9) | o_bb. """
+    return ~((s >> 9) | s) & 0o777
+
+
+def _migrate_state_key(s):
+    """ Convert a legacy 9-character string state key to the integer key. """
+    x_bb = sum(1 << k for k, c in enumerate(s) if c == 'X')
+    o_bb = sum(1 << k for k, c in enumerate(s) if c == 'O')
+    return (x_bb << 9) | o_bb
+
 
 class Learner(ABC):
     """
@@ -20,23 +44,30 @@ class Learner(ABC):
         probability of random action vs. greedy action
     eps_decay : float
         epsilon decay rate. Larger value = more decay
+    symmetric : bool
+        share Q values between the rotations and reflections of a board
+        (see game.canonicalState). Off by default: the teacher's rules are
+        not symmetric, so against it symmetric boards are not equivalent.
     """
-    def __init__(self, alpha, gamma, eps, eps_decay=0.):
+    def __init__(self, alpha, gamma, eps, eps_decay=0., symmetric=False):
         # Agent parameters
         self.alpha = alpha
         self.gamma = gamma
         self.eps = eps
         self.eps_decay = eps_decay
+        self.symmetric = symmetric
         # Possible actions correspond to the set of all x,y coordinate pairs
         self.actions = []
         for i in range(3):
             for j in range(3):
                 self.actions.append((i,j))
         # Initialize Q values to 0 for all state-action pairs.
-        # Access value for action a, state s via Q[a][s]
-        self.Q = {}
-        for action in self.actions:
-            self.Q[action] = collections.defaultdict(int)
+        # Q[c] is an array over the 9 cells; action (i,j) is at index 3*i + j.
+        # c is the state itself, or its canonical state if symmetric (see
+        # orient).
+        self.Q = collections.defaultdict(_zero_values)
+        # Number of updates applied to each Q value, same layout as Q
+        self.visits = collections.defaultdict(_zero_counts)
         # Keep a list of reward received at each episode
         self.rewards = []
 
@@ -46,17 +77,20 @@ class Learner(ABC):
 
         Parameters
         ----------
-        s : string
+        s : int
             state
         """
+        # Choose in the orientation the Q values are stored in
+        c, p = self.orient(s)
         # Only consider the allowed actions (empty board spaces)
-        possible_actions = [a for a in self.actions if s[a[0]*3 + a[1]] == '-']
+        legal = MASK_TO_CELLS[_empty_cells(c)]
         if random.random() < self.eps:
             # Random choose.
-            action = possible_actions[random.randint(0,len(possible_actions)-1)]
+            possible = np.flatnonzero(legal)
+            ix_select = possible[random.randint(0,len(possible)-1)]
         else:
             # Greedy choose.
-            values = np.array([self.Q[a][s] for a in possible_actions])
+            values = np.where(legal, self.Q[c], -np.inf)
             # Find location of max
             ix_max = np.where(values == np.max(values))[0]
             if len(ix_max) > 1:
@@ -65,13 +99,42 @@ class Learner(ABC):
             else:
                 # If unique max action, select that one
                 ix_select = ix_max[0]
-            action = possible_actions[ix_select]
+        # map the chosen cell back onto the real board
+        action = self.actions[SYM_INVERSE[p][ix_select]]
 
         # update epsilon; geometric decay
         self.eps *= (1.-self.eps_decay)
 
         return action
 
+    def orient(self, s):
+        """
+        Return (c, p): the key Q values for state s are stored under, and
+        the index p of the symmetry in game.SYM_PERMS that maps s onto c.
+        """
+        if self.symmetric:
+            return canonicalState(s)
+        return s, 0
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled agent, converting the legacy Q[a][s] layout (with
+        string or integer state keys) into per-state value arrays.
+        """
+        self.__dict__.update(state)
+        if 'visits' not in state:
+            self.visits = collections.defaultdict(_zero_counts)
+        if 'symmetric' not in state:
+            self.symmetric = False
+        if any(isinstance(a, tuple) for a in self.Q):
+            table = collections.defaultdict(_zero_values)
+            for (i, j), q in self.Q.items():
+                for s, v in q.items():
+                    if isinstance(s, str):
+                        s = _migrate_state_key(s)
+                    table[s][3*i + j] = v
+            self.Q = table
+
     def save(self, path):
         """ Pickle the agent object instance to save the agent's state. """
         if os.path.isfile(path):
@@ -89,8 +152,8 @@ class Qlearner(Learner):
     """
     A class to implement the Q-learning agent.
     """
-    def __init__(self, alpha, gamma, eps, eps_decay=0.):
-        super().__init__(alpha, gamma, eps, eps_decay)
+    def __init__(self, alpha, gamma, eps, eps_decay=0., symmetric=False):
+        super().__init__(alpha, gamma, eps, eps_decay, symmetric)
 
     def update(self, s, s_, a, a_, r):
         """
@@ -98,9 +161,9 @@ class Qlearner(Learner):
 
         Parameters
         ----------
-        s : string
+        s : int
             previous state
-        s_ : string
+        s_ : int
             new state
         a : (i,j) tuple
             previous action
@@ -109,16 +172,20 @@ class Qlearner(Learner):
         r : int
             reward received after executing action "a" in state "s"
         """
+        # Work in the stored orientation; move actions into it too
+        c, p = self.orient(s)
+        q, k = self.Q[c], SYM_PERMS[p][3*a[0] + a[1]]
         # Update Q(s,a)
         if s_ is not None:
-            # hold list of Q values for all a_,s_ pairs. We will access the max later
-            possible_actions = [action for action in self.actions if s_[action[0]*3 + action[1]] == '-']
-            Q_options = [self.Q[action][s_] for action in possible_actions]
+            c_ = self.orient(s_)[0]
+            # max Q value over the actions allowed in s_
+            Q_max = self.Q[c_][MASK_TO_CELLS[_empty_cells(c_)]].max()
             # update
-            self.Q[a][s] += self.alpha*(r + self.gamma*max(Q_options) - self.Q[a][s])
+            q[k] += self.alpha*(r + self.gamma*Q_max - q[k])
         else:
             # terminal state update
-            self.Q[a][s] += self.alpha*(r - self.Q[a][s])
+            q[k] += self.alpha*(r - q[k])
+        self.visits[c][k] += 1
 
         # add r to rewards list
         self.rewards.append(r)
@@ -128,8 +195,8 @@ class SARSAlearner(Learner):
     """
     A class to implement the SARSA agent.
     """
-    def __init__(self, alpha, gamma, eps, eps_decay=0.):
-        super().__init__(alpha, gamma, eps, eps_decay)
+    def __init__(self, alpha, gamma, eps, eps_decay=0., symmetric=False):
+        super().__init__(alpha, gamma, eps, eps_decay, symmetric)
 
     def update(self, s, s_, a, a_, r):
         """
@@ -137,9 +204,9 @@ class SARSAlearner(Learner):
 
         Parameters
         ----------
-        s : string
+        s : int
             previous state
-        s_ : string
+        s_ : int
             new state
         a : (i,j) tuple
             previous action
@@ -148,12 +215,17 @@ class SARSAlearner(Learner):
         r : int
             reward received after executing action "a" in state "s"
         """
+        # Work in the stored orientation; move actions into it too
+        c, p = self.orient(s)
+        q, k = self.Q[c], SYM_PERMS[p][3*a[0] + a[1]]
         # Update Q(s,a)
         if s_ is not None:
-            self.Q[a][s] += self.alpha*(r + self.gamma*self.Q[a_][s_] - self.Q[a][s])
+            c_, p_ = self.orient(s_)
+            q[k] += self.alpha*(r + self.gamma*self.Q[c_][SYM_PERMS[p_][3*a_[0] + a_[1]]] - q[k])
         else:
             # terminal state update
-            self.Q[a][s] += self.alpha*(r - self.Q[a][s])
+            q[k] += self.alpha*(r - q[k])
+        self.visits[c][k] += 1
 
         # add r to rewards list
         self.rewards.append(r)
@@ -1,5 +1,84 @@
+import os
 import random
-from functools import lru_cache
+import tempfile
+
+import numpy as np
+
+from . import _fast
+from ._fast import FULL_BOARD
+
+
+# ---------- Bitboard representation ----------
+# Each side's pieces are held in a 9-bit integer; cell (i, j) is bit 3*i + j.
+
+# IS_WIN[bb] is True if bitboard bb contains a complete line; a tuple of
+# bools indexes faster from plain Python than the kernel's numpy array
+IS_WIN = tuple(_fast.IS_WIN.tolist())
+BIT_TO_IJ = {1 << k: divmod(k, 3) for k in range(9)}
+# MASK_TO_CELLS[mask] is a length-9 boolean array, True at the cells set in mask
+MASK_TO_CELLS = np.array([[mask >> k & 1 for k in range(9)] for mask in range(FULL_BOARD + 1)],
+                         dtype=bool)
+
+# The 8 symmetries of the board (4 rotations, each optionally mirrored) as
+# maps of cell (i, j) to its image. SYM_PERMS[p][k] is the image of cell k
+# under symmetry p and SYM_INVERSE[p] undoes it; SYM_TABLES[p][bb] applies
+# symmetry p to a whole bitboard.
+_SYMMETRIES = (
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i),
+)
+SYM_PERMS = tuple(tuple(3 * f(*divmod(k, 3))[0] + f(*divmod(k, 3))[1] for k in range(9))
+                  for f in _SYMMETRIES)
+SYM_INVERSE = tuple(tuple(perm.index(c) for c in range(9)) for perm in SYM_PERMS)
+SYM_TABLES = tuple(tuple(sum(1 << perm[k] for k in range(9) if bb >> k & 1)
+                         for bb in range(FULL_BOARD + 1))
+                   for perm in SYM_PERMS)
+
+
+def packBoard(board):
+    """
+    Converts 2D list representing the board state into an (x_bb, o_bb)
+    pair of bitboards.
+
+    Parameters
+    ----------
+    board : list of lists
+        the current game board
+    """
+    x_bb = o_bb = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == 'X':
+                x_bb |= 1 << (3 * i + j)
+            elif board[i][j] == 'O':
+                o_bb |= 1 << (3 * i + j)
+    return x_bb, o_bb
+
+
+def unpackBoard(x_bb, o_bb):
+    """
+    Converts an (x_bb, o_bb) pair of bitboards back into a 2D list.
+
+    Parameters
+    ----------
+    x_bb : int
+        bitboard of 'X' pieces
+    o_bb : int
+        bitboard of 'O' pieces
+    """
+    board = [['-', '-', '-'], ['-', '-', '-'], ['-', '-', '-']]
+    for bit, (i, j) in BIT_TO_IJ.items():
+        if x_bb & bit:
+            board[i][j] = 'X'
+        elif o_bb & bit:
+            board[i][j] = 'O'
+    return board
 
 
 class Game:
@@ -7,16 +86,31 @@ class Game:
     def __init__(self, agent, teacher=None):
         self.agent = agent
         self.teacher = teacher
-        # initialize the game board
-        self.board = [['-', '-', '-'], ['-', '-', '-'], ['-', '-', '-']]
+        # initialize the game board; one bitboard per player
+        self.x_bb = 0
+        self.o_bb = 0
+
+    @property
+    def board(self):
+        """
+        A snapshot of the game board as a 2D list, for display. Each access
+        builds a new list from the bitboards, so writing into it (e.g.
+        game.board[i][j] = 'X') does not change the game; assign a whole
+        board instead, or set bits in x_bb/o_bb.
+        """
+        return unpackBoard(self.x_bb, self.o_bb)
+
+    @board.setter
+    def board(self, board):
+        self.x_bb, self.o_bb = packBoard(board)
 
     def playerMove(self):
         """
         Querry player for a move and update the board accordingly.
         """
         if self.teacher is not None:
-            action = self.teacher.makeMove(self.board)
-            self.board[action[0]][action[1]] = 'X'
+            action = self.teacher.makeMove(state=self.getStateKey())
+            self.x_bb |= 1 << (3 * action[0] + action[1])
         else:
             printBoard(self.board)
             while True:
@@ -28,17 +122,25 @@ class Game:
                 except ValueError:
                     print("INVALID INPUT! Please use the correct format.")
                     continue
-                if row not in range(3) or col not in range(3) or not self.board[row][col] == '-':
+                if row not in range(3) or col not in range(3) or \
+                        (self.x_bb | self.o_bb) & (1 << (3 * row + col)):
                     print("INVALID MOVE! Choose again.")
                     continue
-                self.board[row][col] = 'X'
+                self.x_bb |= 1 << (3 * row + col)
                 break
 
     def agentMove(self, action):
         """
         Update board according to agent's move.
         """
-        self.board[action[0]][action[1]] = 'O'
+        self.o_bb |= 1 << (3 * action[0] + action[1])
+
+    def getStateKey(self):
+        """
+        Integer key of the current board state, (x_bb << 9) | o_bb.
+        Keys are used for Q-value hashing.
+        """
+        return (self.x_bb << 9) | self.o_bb
 
     def checkForWin(self, key):
         """
@@ -50,30 +152,14 @@ class Game:
         key : string
             token of most recent player. Either 'O' or 'X'
         """
-        # check for player win on diagonals
-        a = [self.board[0][0], self.board[1][1], self.board[2][2]]
-        b = [self.board[0][2], self.board[1][1], self.board[2][0]]
-        if a.count(key) == 3 or b.count(key) == 3:
-            return True
-        # check for player win on rows/columns
-        for i in range(3):
-            col = [self.board[0][i], self.board[1][i], self.board[2][i]]
-            row = [self.board[i][0], self.board[i][1], self.board[i][2]]
-            if col.count(key) == 3 or row.count(key) == 3:
-                return True
-        return False
+        return IS_WIN[self.x_bb if key == 'X' else self.o_bb]
 
     def checkForDraw(self):
         """
         Check to see whether the game has ended in a draw. Returns a
         boolean holding truth value.
         """
-        draw = True
-        for row in self.board:
-            for elt in row:
-                if elt == '-':
-                    draw = False
-        return draw
+        return (self.x_bb | self.o_bb) == FULL_BOARD
 
     def checkForEnd(self, key):
         """
@@ -115,7 +201,7 @@ class Game:
         # Initialize the agent's state and action
         if player_first:
             self.playerMove()
-        prev_state = getStateKey(self.board)
+        prev_state = self.getStateKey()
         prev_action = self.agent.get_action(prev_state)
 
         # iterate until game is over
@@ -136,7 +222,7 @@ class Game:
             else:
                 # game continues. 0 reward
                 reward = 0
-            new_state = getStateKey(self.board)
+            new_state = self.getStateKey()
 
             # determine new action (epsilon-greedy)
             new_action = self.agent.get_action(new_state)
@@ -194,106 +280,171 @@ def printBoard(board):
 
 def getStateKey(board):
     """
-    Converts 2D list representing the board state into a string key
-    for that state. Keys are used for Q-value hashing.
+    Converts 2D list representing the board state into an integer key
+    for that state, (x_bb << 9) | o_bb. Keys are used for Q-value hashing.
 
     Parameters
     ----------
     board : list of lists
         the current game board
     """
-    key = ''
-    for row in board:
-        for elt in row:
-            key += elt
-    return key
-
+    x_bb, o_bb = packBoard(board)
+    return (x_bb << 9) | o_bb
 
 
+_CANONICAL = {}
 
 
+def canonicalState(s):
+    """
+    Returns (c, p): the smallest state key among the 8 symmetric images of
+    state s, and the symmetry p with SYM_TABLES[p] mapping s onto c. Cell k
+    of s corresponds to cell SYM_PERMS[p][k] of c.
 
-# ---------- Minimax baseline with transposition cache ----------
+    Parameters
+    ----------
+    s : int
+        state key, (x_bb << 9) | o_bb
+    """
+    hit = _CANONICAL.get(s)
+    if hit is None:
+        x_bb, o_bb = s >> 9, s & FULL_BOARD
+        hit = _CANONICAL[s] = min((t[x_bb] << 9 | t[o_bb], p) for p, t in enumerate(SYM_TABLES))
+    return hit
 
-def _flatten(board):
-    return ''.join(board[i][j] for i in range(3) for j in range(3))
 
+# ---------- Minimax baseline ----------
 
-def _legal_moves(board):
-    moves = []
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == '-':
-                moves.append((i, j))
-    return moves
+def _legal_moves(x_bb, o_bb):
+    # yields the bit of each empty cell, lowest first
+    mask = ~(x_bb | o_bb) & FULL_BOARD
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
 
 
-def _winner(board):
+def _winner(x_bb, o_bb):
     # returns 'X', 'O', 'D' for draw, or None if ongoing
-    lines = [
-        # rows
-        [(0, 0), (0, 1), (0, 2)],
-        [(1, 0), (1, 1), (1, 2)],
-        [(2, 0), (2, 1), (2, 2)],
-        # cols
-        [(0, 0), (1, 0), (2, 0)],
-        [(0, 1), (1, 1), (2, 1)],
-        [(0, 2), (1, 2), (2, 2)],
-        # diagonals
-        [(0, 0), (1, 1), (2, 2)],
-        [(0, 2), (1, 1), (2, 0)],
-    ]
-    for line in lines:
-        a, b, c = line
-        v1, v2, v3 = board[a[0]][a[1]], board[b[0]][b[1]], board[c[0]][c[1]]
-        if v1 != '-' and v1 == v2 == v3:
-            return v1
-    if any(board[i][j] == '-' for i in range(3) for j in range(3)):
-        return None
-    return 'D'
-
-
-@lru_cache(maxsize=None)
-def _minimax_cached(flat_board, player):
-    # player: 'X' or 'O' — returns (score, best_move)
-    board = [[flat_board[r * 3 + c] for c in range(3)] for r in range(3)]
-    term = _winner(board)
-    if term == 'X':
-        return 1, None
-    if term == 'O':
-        return -1, None
-    if term == 'D':
-        return 0, None
-
-    moves = _legal_moves(board)
-    if player == 'X':
-        best_score = -2
-        best_mv = None
-        for (i, j) in moves:
-            board[i][j] = 'X'
-            sc, _ = _minimax_cached(_flatten(board), 'O')
-            board[i][j] = '-'
-            if sc > best_score:
-                best_score, best_mv = sc, (i, j)
-                if best_score == 1:
-                    break
-        return best_score, best_mv
-    else:
-        best_score = 2
-        best_mv = None
-        for (i, j) in moves:
-            board[i][j] = 'O'
-            sc, _ = _minimax_cached(_flatten(board), 'X')
-            board[i][j] = '-'
-            if sc < best_score:
-                best_score, best_mv = sc, (i, j)
-                if best_score == -1:
-                    break
-        return best_score, best_mv
+    if IS_WIN[x_bb]:
+        return 'X'
+    if IS_WIN[o_bb]:
+        return 'O'
+    if (x_bb | o_bb) == FULL_BOARD:
+        return 'D'
+    return None
+
+
+def _winner_after(x_bb, o_bb, side):
+    # result after a move by side ('X' or 'O'): 1 if it won, 0 if the board is
+    # now full, -1 if the game goes on. Only the mover can have just won.
+    if IS_WIN[x_bb if side == 'X' else o_bb]:
+        return 1
+    if (x_bb | o_bb) == FULL_BOARD:
+        return 0
+    return -1
+
+
+# transposition table shared by every search in this process
+_MEMO = _fast.new_memo()
+
+
+def _minimax(x_bb, o_bb, key):
+    # key: 'X' or 'O' — returns (score, best_move_bit), 0 at a terminal position
+    score, mv = _fast.minimax(x_bb, o_bb, 0 if key == 'X' else 1, _MEMO)
+    return int(score), int(mv)
+
+
+# ---------- Precomputed minimax lookup table ----------
+
+# bump when the file format changes or the search changes which of several
+# equal moves it picks
+_LUT_VERSION = 4
+_LUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'minimax.v%d.npy' % _LUT_VERSION)
+_LUT_SIZE = 1 << 19
+
+
+def _lut_key(x_bb, o_bb, key):
+    # side to move in bit 18, X pieces in bits 9-17, O pieces in bits 0-8
+    return (key == 'O') << 18 | x_bb << 9 | o_bb
+
+
+def _build_lut():
+    """
+    Solve every position reachable from the empty board, with either player
+    moving first, in one bottom-up pass.
+
+    Returns an array indexed by _lut_key() holding (score + 1) << 9 | move
+    bit for the player to move, with score +1/0/-1 as in _minimax(). Terminal
+    and unreachable positions are 0.
+    """
+    # Breadth-first from both roots. Every move adds one piece, so each
+    # layer holds the positions with one more piece than the last, and the
+    # reversed list visits children before their parents.
+    keys = []
+    layer = {_lut_key(0, 0, 'X'), _lut_key(0, 0, 'O')}
+    while layer:
+        keys.extend(sorted(layer))
+        nxt = set()
+        for k in layer:
+            side, x_bb, o_bb = k >> 18, k >> 9 & FULL_BOARD, k & FULL_BOARD
+            for bit in _legal_moves(x_bb, o_bb):
+                cx, co = (x_bb | bit, o_bb) if side == 0 else (x_bb, o_bb | bit)
+                if _winner(cx, co) is None:
+                    nxt.add((1 - side) << 18 | cx << 9 | co)
+        layer = nxt
+    lut = np.zeros(_LUT_SIZE, dtype=np.uint16)
+    _fast.fill_table(np.array(keys, dtype=np.int64), lut)
+    return lut
+
+
+def _save_lut(lut):
+    # Write to a temporary file next to _LUT_PATH and rename it into place,
+    # so an interrupted save or a concurrent reader never sees a partial file
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(_LUT_PATH),
+                                   prefix='minimax.', suffix='.npy')
+    except OSError:
+        # read-only install (e.g. serverless); keep the table in memory only
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, lut)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, _LUT_PATH)
+    except OSError:
+        os.remove(tmp)
+
+
+def _load_lut():
+    """ Load the lookup table from disk, building and saving it if missing. """
+    try:
+        lut = np.load(_LUT_PATH)
+        if lut.shape != (_LUT_SIZE,) or lut.dtype != np.uint16:
+            raise ValueError('stale lookup table')
+    except (OSError, EOFError, ValueError):
+        lut = _build_lut()
+        _save_lut(lut)
+    # indexing a list is several times faster than fetching numpy scalars
+    return lut.tolist()
+
+
+BEST_MOVE = _load_lut()
+
+
+def minimax_move(x_bb, o_bb, key='X'):
+    """Return optimal move bit for given key on a bitboard position."""
+    mv = BEST_MOVE[_lut_key(x_bb, o_bb, key)] & FULL_BOARD
+    if not mv:
+        # position not reachable in normal play; search it directly
+        _, mv = _minimax(x_bb, o_bb, key)
+    # fallback to first legal if somehow no move was found
+    return mv if mv else next(_legal_moves(x_bb, o_bb))
 
 
 def best_move_minimax(board, key='X'):
-    """Return optimal move (i, j) for given key using cached minimax."""
-    _, mv = _minimax_cached(_flatten(board), key)
-    # fallback to first legal if somehow None
-    return mv if mv is not None else (_legal_moves(board)[0])
+    """Return optimal move (i, j) for given key using the minimax lookup table."""
+    x_bb, o_bb = packBoard(board)
+    return BIT_TO_IJ[minimax_move(x_bb, o_bb, key)]
@@ -1,5 +1,5 @@
 import random
-from .game import best_move_minimax
+from .game import BIT_TO_IJ, FULL_BOARD, getStateKey, minimax_move, unpackBoard
 
 class Teacher:
     """ 
@@ -24,6 +24,9 @@ class Teacher:
         self.ability_level = level
         # strategy: 'rules' (existing heuristic) or 'minimax' (optimal)
         self.strategy = strategy
+        # The rule hierarchy always gives the same move for the same board,
+        # so remember it per state key
+        self.rule_moves = {}
 
     def win(self, board, key='X'):
         """ If we have two in a row and the 3rd is available, take it. """
@@ -181,20 +184,42 @@ class Teacher:
                     possibles += [(i, j)]
         return possibles[random.randint(0, len(possibles)-1)]
 
-    def makeMove(self, board):
+    def makeMove(self, board=None, state=None):
         """
         Trainer goes through a hierarchy of moves, making the best move that
         is currently available each time. A touple is returned that represents
         (row, col).
+
+        Parameters
+        ----------
+        board : list of lists, optional
+            the current game board
+        state : int, optional
+            getStateKey(board). Give at least one of board and state; when
+            only state is given, the 2D board is built only if a rule or a
+            random move needs it.
         """
+        if state is None:
+            state = getStateKey(board)
         # Chance to deviate from optimal to avoid determinism
         if random.random() > self.ability_level:
+            if board is None:
+                board = unpackBoard(state >> 9, state & FULL_BOARD)
             return self.randomMove(board)
 
         if self.strategy == 'minimax':
-            return best_move_minimax(board, key='X')
+            return BIT_TO_IJ[minimax_move(state >> 9, state & FULL_BOARD, key='X')]
 
         # Default heuristic strategy
+        a = self.rule_moves.get(state)
+        if a is None:
+            if board is None:
+                board = unpackBoard(state >> 9, state & FULL_BOARD)
+            a = self.rule_moves[state] = self.ruleMove(board)
+        return a
+
+    def ruleMove(self, board):
+        """ Walk the rule hierarchy and return the first move that applies. """
         a = self.win(board)
         if a is not None:
             return a
@@ -1,35 +1,135 @@
+import argparse
+import os
+import random
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
 from tictactoe.agent import Qlearner
 from tictactoe.teacher import Teacher
 from tictactoe.game import Game
 
-def train_agent(episodes=50000, teacher_ability=0.9):
-    """Train a Q-learning agent."""
-    print(f"Training Q-learning agent for {episodes} episodes...")
-    print(f"Teacher ability level: {teacher_ability}")
-    
-    agent = Qlearner(alpha=0.5, gamma=0.9, eps=0.1)
+
+def _train_chunk(seed, episodes, teacher_ability, agent):
+    """
+    Train this worker's copy of `agent` on its share of the episodes.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    agent.rewards = []
     teacher = Teacher(level=teacher_ability)
-    
-    start_time = time.time()
-    
-    for i in range(episodes):
+    for _ in range(episodes):
         game = Game(agent, teacher=teacher)
         game.start()
-        
-        # Progress updates
-        if (i + 1) % 10000 == 0:
-            elapsed = time.time() - start_time
-            print(f"Episode {i + 1}/{episodes} | Time: {elapsed:.1f}s")
-    
+    return agent
+
+
+def _merge_agents(base, agents):
+    """
+    Combine agents trained from the same starting point `base` into one.
+    Each Q value is the mean of the workers' values weighted by how often
+    each worker updated it in this round; values no worker updated keep
+    their value from `base`.
+    """
+    merged = type(base)(base.alpha, base.gamma, base.eps, base.eps_decay, base.symmetric)
+    for s, q in base.Q.items():
+        merged.Q[s] = q.copy()
+    for s, n in base.visits.items():
+        merged.visits[s] = n.copy()
+    merged.rewards = list(base.rewards)
+    total, count = {}, {}
+    for agent in agents:
+        for s, n in agent.visits.items():
+            # updates made by this worker since it was handed `base`
+            n = n - base.visits.get(s, 0)
+            total[s] = total.get(s, 0) + agent.Q[s] * n
+            count[s] = count.get(s, 0) + n
+        merged.rewards.extend(agent.rewards)
+        # eps decays geometrically per action, so apply every worker's decay
+        if base.eps:
+            merged.eps *= agent.eps / base.eps
+    for s, n in count.items():
+        merged.Q[s] = np.where(n > 0, total[s] / np.maximum(n, 1), merged.Q[s])
+        merged.visits[s] += n
+    return merged
+
+
+def train_agent(episodes=50000, teacher_ability=0.9, workers=1, merge_every=1000,
+                symmetric=False):
+    """
+    Train a Q-learning agent. With workers > 1 (None = one per CPU) the
+    episodes run in rounds of `merge_every`: each worker process trains a
+    copy of the current agent on an equal share of the round, and the
+    copies are merged into the agent for the next round. symmetric is
+    passed on to the Qlearner.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, episodes))
+
+    print(f"Training Q-learning agent for {episodes} episodes...")
+    print(f"Teacher ability level: {teacher_ability}")
+
+    start_time = time.time()
+
+    if workers == 1:
+        agent = Qlearner(alpha=0.5, gamma=0.9, eps=0.1, symmetric=symmetric)
+        teacher = Teacher(level=teacher_ability)
+
+        for i in range(episodes):
+            game = Game(agent, teacher=teacher)
+            game.start()
+
+            # Progress updates
+            if (i + 1) % 10000 == 0:
+                elapsed = time.time() - start_time
+                print(f"Episode {i + 1}/{episodes} | Time: {elapsed:.1f}s")
+    else:
+        print(f"Worker processes: {workers}")
+        agent = Qlearner(alpha=0.5, gamma=0.9, eps=0.1, symmetric=symmetric)
+        done = 0
+        with ProcessPoolExecutor(workers) as ex:
+            while done < episodes:
+                n = min(merge_every, episodes - done)
+                chunks = [n // workers + (k < n % workers) for k in range(workers)]
+                seeds = [random.randrange(2**32) for _ in range(workers)]
+                agents = list(ex.map(_train_chunk, seeds, chunks,
+                                     [teacher_ability] * workers, [agent] * workers))
+                agent = _merge_agents(agent, agents)
+                done += n
+
+                # Progress updates
+                if done // 10000 > (done - n) // 10000:
+                    elapsed = time.time() - start_time
+                    print(f"Episode {done}/{episodes} | Time: {elapsed:.1f}s")
+
     # Saves trained agent
     agent.save('q_agent.pkl')
-    
+
     total_time = time.time() - start_time
     print(f"\n✅ Training complete in {total_time:.1f} seconds!")
     print(f"Agent saved to: q_agent.pkl")
     print(f"Total rewards: {sum(agent.rewards)}")
     print(f"Win rate (approx): {(sum(1 for r in agent.rewards if r > 0) / len(agent.rewards)) * 100:.1f}%")
 
+def main():
+    parser = argparse.ArgumentParser(description='Train a Q-learning agent against the teacher.')
+    parser.add_argument('--episodes', type=int, default=50000, help='Number of training episodes')
+    parser.add_argument('--teacher-ability', type=float, default=0.9, help='Teacher ability level')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes, 0 = one per CPU (default: 1)')
+    parser.add_argument('--merge-every', type=int, default=1000, help='Episodes per merge round when workers > 1')
+    parser.add_argument('--symmetric', action='store_true', help='Share Q values between symmetric boards')
+    args = parser.parse_args()
+
+    train_agent(
+        episodes=args.episodes,
+        teacher_ability=args.teacher_ability,
+        workers=args.workers or None,
+        merge_every=args.merge_every,
+        symmetric=args.symmetric,
+    )
+
+
 if __name__ == "__main__":
-    train_agent(episodes=50000, teacher_ability=0.9)
+    main()